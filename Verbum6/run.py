@@ -12,11 +12,13 @@ Environment Variables:
     FLASK_ENV: The environment to run in (development, testing, production)
     OPENAI_API_KEY: API key for OpenAI integration (optional for basic functionality)
     PORT: Port number to run the application on (default: 5001)
+    WEB_THREADS: Worker threads serving requests outside development (default: 8)
 """
 
 import os
 import sys
 import logging
+from waitress import serve
 from app import create_app
 
 # Configure basic logging with timestamp
@@ -38,6 +40,18 @@ def get_port():
         logger.error("Invalid PORT environment variable")
         return 5001
 
+def get_threads():
+    """Get and validate the number of server threads from environment."""
+    try:
+        threads = int(os.getenv('WEB_THREADS', 8))
+        if threads < 1:
+            logger.warning(f"Thread count {threads} out of range, using default 8")
+            return 8
+        return threads
+    except ValueError:
+        logger.error("Invalid WEB_THREADS environment variable")
+        return 8
+
 def get_environment():
     """Get and validate environment configuration."""
     env = os.getenv('FLASK_ENV', 'development')
@@ -59,12 +73,17 @@ def configure_app(app, env, port):
     # Configure server based on environment
     debug_mode = env == 'development'
     try:
-        app.run(
-            host='0.0.0.0',
-            port=port,
-            debug=debug_mode,
-            use_reloader=debug_mode
-        )
+        if debug_mode:
+            app.run(
+                host='0.0.0.0',
+                port=port,
+                debug=True,
+                use_reloader=True,
+                threaded=True
+            )
+        else:
+            # Flask's built-in server isn't meant for production; use waitress
+            serve(app, host='0.0.0.0', port=port, threads=get_threads())
     except OSError as e:
         logger.error(f"Failed to start server: {str(e)}")
         sys.exit(1)
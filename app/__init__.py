@@ -7,6 +7,8 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from app.api.routes import api_bp
+from app.extensions import cache, compress
+from app.json_provider import OrjsonProvider
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +18,7 @@ def create_app(env):
     app = Flask(__name__, 
                 template_folder='templates',
                 static_folder='static')
+    app.json = OrjsonProvider(app)
     CORS(app)
     
     # Configuration
@@ -23,8 +26,19 @@ def create_app(env):
         SECRET_KEY=os.getenv('SECRET_KEY', 'dev-key-change-in-production'),
         UPLOAD_FOLDER=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'inputDocs'),  # Note lowercase 'inputDocs'
         MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB max file size
-        TEMPLATES_AUTO_RELOAD=True if env == 'development' else False
+        # Internal nginx location serving UPLOAD_FOLDER, e.g. '/_protected/'
+        X_ACCEL_REDIRECT_PREFIX=os.getenv('X_ACCEL_REDIRECT_PREFIX'),
+        # Load static/hierarchy.json from scripts/build_hierarchy.py instead of /api/hierarchy
+        STATIC_HIERARCHY=os.getenv('STATIC_HIERARCHY', '').lower() in ('1', 'true'),
+        TEMPLATES_AUTO_RELOAD=True if env == 'development' else False,
+        # Hierarchy JSON is large and repetitive, so compress it and cache views briefly
+        COMPRESS_ALGORITHM=['br', 'gzip'],
+        COMPRESS_LEVEL=6,
+        CACHE_TYPE='SimpleCache',
+        CACHE_DEFAULT_TIMEOUT=60
     )
+    compress.init_app(app)
+    cache.init_app(app)
     
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/')
@@ -3,50 +3,50 @@ app/api/routes.py
 Routes for the Verbum6 application.
 """
 
-from flask import Blueprint, jsonify, current_app, render_template, send_file, request
+from flask import Blueprint, jsonify, current_app, render_template, send_file, request, url_for
+from werkzeug.utils import safe_join
+from urllib.parse import quote
 import os
 import fitz  # PyMuPDF for PDF processing
-from app.core.document_processor import DocumentProcessor
+from app.core.document_processor import get_processor
 from app.core.semantic_processor import SemanticProcessor
+from app.extensions import cache
 
 # Create blueprint with template folder specified
 api_bp = Blueprint('api', __name__, template_folder='../templates', static_folder='../static')
 
+def _is_success(rv):
+    """Cache filter: error responses are returned as (body, status) tuples."""
+    return not isinstance(rv, tuple)
+
 @api_bp.route('/')
 def index():
     """Serve the main visualization page."""
-    return render_template('index.html')
+    if current_app.config['STATIC_HIERARCHY']:
+        hierarchy_url = url_for('static', filename='hierarchy.json')
+    else:
+        hierarchy_url = url_for('api.get_hierarchy')
+    return render_template('index.html', hierarchy_url=hierarchy_url)
 
 @api_bp.route('/api/hierarchy')
+@cache.cached(timeout=60, response_filter=_is_success)
 def get_hierarchy():
     """Get the document hierarchy for visualization."""
     try:
-        processor = DocumentProcessor(current_app.config['UPLOAD_FOLDER'])
-        hierarchy = {
-            "hierarchy": {
-                "name": "root",
-                "type": "folder",
-                "children": [
-                    {
-                        "name": folder,
-                        "type": "folder",
-                        "path": folder,
-                        "children": processor.get_folder_contents(folder)
-                    } for folder in processor.get_top_level_folders()
-                ]
-            }
-        }
-        return jsonify(hierarchy)
+        processor = get_processor(current_app.config['UPLOAD_FOLDER'])
+        return current_app.response_class(processor.get_hierarchy(), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/api/documents')
+@cache.cached(timeout=60, query_string=True, response_filter=_is_success)
 def get_documents():
     """Get document relationships and positions for visualization."""
     try:
-        processor = DocumentProcessor(current_app.config['UPLOAD_FOLDER'])
-        relationships = processor.get_document_relationships()
-        return jsonify(relationships)
+        processor = get_processor(current_app.config['UPLOAD_FOLDER'])
+        include_previews = request.args.get('previews', '').lower() in ('1', 'true')
+        relationships = processor.get_document_relationships(include_previews)
+        return current_app.response_class(relationships, mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -55,6 +55,18 @@ def get_document(filepath):
     """Serve document content."""
     try:
         full_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filepath)
+        accel_prefix = current_app.config['X_ACCEL_REDIRECT_PREFIX']
+        if accel_prefix and filepath.lower().endswith('.pdf'):
+            # Let nginx send the file from an internal location
+            accel_path = safe_join(accel_prefix, filepath)
+            if accel_path is None or not os.path.isfile(full_path):
+                return jsonify({'error': 'Document not found'}), 404
+            return current_app.response_class(
+                mimetype='application/pdf',
+                # Percent-encoded: headers must be latin-1, and nginx would
+                # otherwise treat '?', '%' and '#' in names as URI syntax
+                headers={'X-Accel-Redirect': quote(accel_path)}
+            )
         if filepath.lower().endswith('.pdf'):
             return send_file(
                 full_path,
@@ -71,20 +83,43 @@ def get_document(filepath):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/api/document/<path:filepath>/preview')
+def get_document_preview(filepath):
+    """Get a text preview of a PDF document."""
+    try:
+        processor = get_processor(current_app.config['UPLOAD_FOLDER'])
+        preview = processor.get_text_preview(filepath)
+        if preview is None:
+            return jsonify({'error': 'Document not found'}), 404
+        return jsonify({
+            'preview': preview,
+            'filename': os.path.basename(filepath)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/api/debug/invalidate-cache', methods=['POST'])
+def invalidate_cache():
+    """Drop cached hierarchies (debug mode only)."""
+    if not current_app.debug:
+        return jsonify({'error': 'Not found'}), 404
+    get_processor(current_app.config['UPLOAD_FOLDER']).invalidate()
+    cache.clear()
+    return jsonify({'status': 'success'})
+
 from flask import jsonify, request
 import asyncio
 
 @api_bp.route('/api/document/query', methods=['POST'])
-def query_document():
+async def query_document():
     """Process a query about a specific document."""
     try:
         data = request.json
         doc_path = data.get('path')
         query = data.get('query')
         
-        processor = DocumentProcessor(current_app.config['UPLOAD_FOLDER'])
-        # Use the sync version instead of async
-        response = processor.process_document_query(doc_path, query)
+        processor = get_processor(current_app.config['UPLOAD_FOLDER'])
+        response = await processor.aprocess_document_query(doc_path, query)
         
         return jsonify({'response': response})
         
@@ -8,42 +8,78 @@ This module handles:
 3. Document relationship analysis
 4. Semantic distance calculations
 
-The hierarchy is built recursively, with each level (folders and documents)
-being processed to extract relevant information for visualization.
+The hierarchy is built with an iterative directory walk, with each level
+(folders and documents) being processed to extract relevant information for visualization.
 """
 
 import os
+import io
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import hashlib
+import stat
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 import fitz  # PyMuPDF
-from dataclasses import dataclass
+import msgspec
+import numpy as np
+import orjson
+from diskcache import Cache
+from werkzeug.utils import safe_join
+import zstandard
 from pathlib import Path
 import openai
-from PyPDF2 import PdfReader
+import tiktoken
+from app.core import embedding_cache
+from app.core.query_cache import SemanticQueryCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class DocumentNode:
+# Model used to embed queries for the semantic response cache
+QUERY_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Token budget for document text sent with a query
+QUERY_CONTEXT_TOKENS = 3500
+# Characters read to fill that budget. English averages ~4 per token, so
+# 8 per token leaves 2x headroom and the token budget is always filled
+QUERY_CONTEXT_MAX_CHARS = QUERY_CONTEXT_TOKENS * 8
+
+# System message for document queries
+_SYSTEM_PROMPT_QUERY = "You are a helpful assistant explaining concepts from documents."
+
+# Pages read when building a text preview
+PREVIEW_MAX_PAGES = 3
+
+# Upper bound on processes extracting PDF previews in parallel
+MAX_PREVIEW_WORKERS = 6
+
+# Longest a cached hierarchy is reused; changes below the root directory
+# don't touch its mtime, so only this bounds how stale a listing can be
+HIERARCHY_MAX_AGE_SECONDS = 60
+
+# Extensions (lowercase) of files included in the document hierarchy
+DOCUMENT_EXTENSIONS = frozenset({'.pdf'})
+
+# Nodes are msgspec Structs so the tree encodes straight to JSON, tagged
+# with a "type" field and without unset optional fields.
+class DocumentNode(msgspec.Struct, tag_field="type", tag="document", omit_defaults=True):
     """Represents a document (PDF) in the hierarchy."""
     name: str
     path: str
     content_preview: str = ""
-    semantic_vector: Optional[List[float]] = None
+    semantic_vector: Optional[np.ndarray] = None
 
-@dataclass
-class FolderNode:
+class FolderNode(msgspec.Struct, tag_field="type", tag="folder", omit_defaults=True):
     """Represents a folder in the hierarchy."""
     name: str
     path: str
-    children: List[Any] = None
-    semantic_center: Optional[List[float]] = None
-
-    def __post_init__(self):
-        if self.children is None:
-            self.children = []
+    children: List[Union["FolderNode", DocumentNode]]
+    semantic_center: Optional[np.ndarray] = None
 
 class DocumentProcessor:
     """Handles document processing and hierarchy building."""
@@ -72,164 +108,602 @@ class DocumentProcessor:
         Returns:
             str: Extracted text preview
         """
+        return _extract_text_preview(pdf_path, max_chars)
+    
+    def get_text_preview(self, doc_path: str) -> Optional[str]:
+        """
+        Get a text preview for a document, extracted on first request.
+        
+        Args:
+            doc_path (str): Document path relative to the root directory
+            
+        Returns:
+            Optional[str]: Extracted text preview, or None if the path escapes
+                the root directory or isn't a file
+        """
+        full_path = safe_join(self.base_path, doc_path)
+        if full_path is None:
+            return None
         try:
-            with fitz.open(pdf_path) as doc:
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-                    if len(text) > max_chars:
-                        break
-                return text[:max_chars]
-        except Exception as e:
-            logger.error(f"Error extracting text from {pdf_path}: {e}")
-            return ""
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return _cached_preview(full_path, st.st_mtime_ns)
     
-    def build_hierarchy(self) -> FolderNode:
+    def build_hierarchy(self, include_previews: bool = False) -> FolderNode:
         """
         Build the complete document hierarchy.
         
+        Args:
+            include_previews (bool): Extract text previews for every PDF,
+                in parallel across worker processes
+        
         Returns:
             FolderNode: Root node of the document hierarchy
         """
-        return self._process_directory(self.root_path)
+        root_path = str(self.root_path)
+        root_name = self.root_path.name
+        if not include_previews:
+            return self._process_directory(root_path, root_name)
+        
+        pending: List[Tuple[DocumentNode, str]] = []
+        root = self._process_directory(root_path, root_name, pending)
+        if pending:
+            paths = [pdf_path for _, pdf_path in pending]
+            previews = _get_preview_pool().map(_extract_text_preview, paths, chunksize=8)
+            for (doc_node, _), preview in zip(pending, previews):
+                doc_node.content_preview = preview
+        return root
     
-    def _process_directory(self, path: Path) -> FolderNode:
+    def _process_directory(self, path: str, rel_path: str,
+                           pending: Optional[List[Tuple[DocumentNode, str]]] = None) -> FolderNode:
         """
-        Recursively process a directory to build the hierarchy.
+        Process a directory tree to build the hierarchy.
+        
+        The tree is walked with an explicit stack rather than recursion, so
+        deep trees cost no Python frames per directory.
         
         Args:
-            path (Path): Directory path to process
+            path (str): Directory path to process
+            rel_path (str): Path of the directory relative to the root's parent
+            pending (Optional[List[Tuple[DocumentNode, str]]]): If given,
+                collects (node, file path) pairs that still need a preview
             
         Returns:
             FolderNode: Node representing the processed directory
         """
-        try:
-            folder = FolderNode(
-                name=path.name,
-                path=str(path.relative_to(self.root_path.parent)),
-                children=[]
-            )
-            
-            for item in path.iterdir():
-                if item.is_dir():
-                    child_node = self._process_directory(item)
-                    folder.children.append(child_node)
-                elif item.suffix.lower() == '.pdf':
-                    doc_node = DocumentNode(
-                        name=item.name,
-                        path=str(item.relative_to(self.root_path.parent)),
-                        content_preview=self.extract_text_preview(str(item))
-                    )
-                    folder.children.append(doc_node)
-            
-            return folder
-            
-        except Exception as e:
-            logger.error(f"Error processing directory {path}: {e}")
-            return FolderNode(name=path.name, path=str(path))
+        root = FolderNode(
+            name=os.path.basename(path),
+            path=rel_path,
+            children=[]
+        )
+        stack = [(path, root)]
+        
+        while stack:
+            dir_path, folder = stack.pop()
+            # Child paths extend this prefix rather than being re-derived per entry
+            prefix = folder.path + os.sep
+            try:
+                # DirEntry caches the file type from readdir, avoiding a stat per item
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _has_utf8_name(entry):
+                                continue
+                            child_node = FolderNode(
+                                name=entry.name,
+                                path=prefix + entry.name,
+                                children=[]
+                            )
+                            folder.children.append(child_node)
+                            stack.append((entry.path, child_node))
+                        elif _has_document_extension(entry.name) and _has_utf8_name(entry):
+                            # Previews are served on demand by get_text_preview()
+                            doc_node = DocumentNode(
+                                name=entry.name,
+                                path=prefix + entry.name,
+                                content_preview=""
+                            )
+                            folder.children.append(doc_node)
+                            if pending is not None:
+                                pending.append((doc_node, entry.path))
+            except Exception as e:
+                logger.error(f"Error processing directory {dir_path}: {e}")
+        
+        return root
             
-    def get_document_relationships(self) -> Dict[str, Any]:
+    def get_document_relationships(self, include_previews: bool = False) -> bytes:
         """
-        Get document relationships for visualization.
+        Get document relationships for visualization, encoded as JSON.
+        
+        Results are cached until the root directory's mtime changes, and
+        for at most HIERARCHY_MAX_AGE_SECONDS.
+        
+        Args:
+            include_previews (bool): Include a text preview for each document
         
         Returns:
-            Dict[str, Any]: Document relationships and hierarchy data
+            bytes: JSON-encoded document relationships and hierarchy data
         """
-        hierarchy = self.build_hierarchy()
-        return {
-            'status': 'success',
-            'hierarchy': self._convert_to_dict(hierarchy)
-        }
+        return _cached_relationships(self.base_path, *self._cache_key(), include_previews)
     
-    def _convert_to_dict(self, node: Any) -> Dict[str, Any]:
+    def get_hierarchy(self) -> bytes:
         """
-        Convert a node (folder or document) to a dictionary representation.
+        Get the folder hierarchy served to the visualization, encoded as JSON.
+        
+        Cached like get_document_relationships().
         
-        Args:
-            node (Union[FolderNode, DocumentNode]): Node to convert
-            
         Returns:
-            Dict[str, Any]: Dictionary representation of the node
-        """
-        if isinstance(node, DocumentNode):
-            return {
-                'type': 'document',
-                'name': node.name,
-                'path': node.path
-            }
-        elif isinstance(node, FolderNode):
-            return {
-                'type': 'folder',
-                'name': node.name,
-                'path': node.path,
-                'children': [self._convert_to_dict(child) for child in node.children]
-            }
-        return {}
+            bytes: JSON-encoded nested folder/document hierarchy
+        """
+        return _cached_hierarchy(self.base_path, *self._cache_key())
+    
+    def invalidate(self):
+        """Drop cached hierarchy results for every root path."""
+        _cached_hierarchy.cache_clear()
+        _cached_relationships.cache_clear()
+    
+    def _cache_key(self) -> Tuple[int, int]:
+        """Get the (root mtime, age bucket) pair used to key cached hierarchies."""
+        return (os.stat(self.base_path).st_mtime_ns,
+                int(time.monotonic() // HIERARCHY_MAX_AGE_SECONDS))
+    
+    def _build_folder_hierarchy(self) -> bytes:
+        """
+        Build the uncached payload for get_hierarchy().
+        
+        JSON is written while the tree is walked, so no intermediate dicts
+        are built. The output matches serializing get_folder_contents()
+        for each top-level folder.
+        """
+        buf = io.BytesIO()
+        write = buf.write
+        write(b'{"hierarchy":{"name":"root","type":"folder","children":[')
+        for i, folder in enumerate(self.get_top_level_folders()):
+            if i:
+                write(b',')
+            name = orjson.dumps(folder)
+            write(b'{"name":' + name + b',"type":"folder","path":' + name + b',"children":')
+            self._write_folder_contents(write, os.path.join(self.base_path, folder), folder)
+            write(b'}')
+        write(b']}}')
+        return buf.getvalue()
+
+    def _write_folder_contents(self, write: Callable[[bytes], Any],
+                               full_path: str, folder_path: str):
+        """Write a folder's contents as a JSON array (see get_folder_contents)."""
+        write(b'[')
+        # Each frame is [remaining entries, relative path prefix, is first child]
+        stack = [[iter(self._list_entries(full_path, folder_path)), folder_path + os.sep, True]]
+        
+        while stack:
+            frame = stack[-1]
+            entry = next(frame[0], None)
+            if entry is None:
+                stack.pop()
+                # Close the children array, and the enclosing folder object if any
+                write(b']}' if stack else b']')
+                continue
+            
+            if not frame[2]:
+                write(b',')
+            frame[2] = False
+            rel_path = frame[1] + entry.name
+            
+            write(b'{"name":' + orjson.dumps(entry.name))
+            if entry.is_dir():
+                write(b',"type":"folder","path":' + orjson.dumps(rel_path) + b',"children":[')
+                stack.append([iter(self._list_entries(entry.path, rel_path)), rel_path + os.sep, True])
+            else:
+                write(b',"type":"document","path":' + orjson.dumps(rel_path) + b'}')
+
+    def _list_entries(self, full_path: str, folder_path: str) -> List[os.DirEntry]:
+        """List a folder's visible entries sorted by name, or [] on error."""
+        try:
+            with os.scandir(full_path) as it:
+                return sorted((e for e in it
+                               if not e.name.startswith('.') and _has_utf8_name(e)),
+                              key=lambda e: e.name)
+        except Exception as e:
+            logger.error(f"Error processing {folder_path}: {str(e)}")
+            return []
 
     def get_top_level_folders(self):
         """Get all top-level folders in InputDocs."""
-        return [d for d in os.listdir(self.base_path) 
-                if os.path.isdir(os.path.join(self.base_path, d))
-                and not d.startswith('.')]
+        with os.scandir(self.base_path) as it:
+            return [entry.name for entry in it
+                    if entry.is_dir() and not entry.name.startswith('.')
+                    and _has_utf8_name(entry)]
 
     def get_folder_contents(self, folder_path):
         """Get contents of a folder with hierarchical structure."""
-        full_path = os.path.join(self.base_path, folder_path)
         contents = []
+        # Each stack item is (absolute path, relative path, list to fill)
+        stack = [(os.path.join(self.base_path, folder_path), folder_path, contents)]
         
-        try:
-            for item in sorted(os.listdir(full_path)):
-                if item.startswith('.'):
-                    continue
-                    
-                item_path = os.path.join(full_path, item)
-                rel_path = os.path.join(folder_path, item)
+        while stack:
+            full_path, rel_folder, children = stack.pop()
+            prefix = rel_folder + os.sep
+            
+            # Entry types come from the directory listing, so files cost no stat
+            for entry in self._list_entries(full_path, rel_folder):
+                item = entry.name
+                rel_path = prefix + item
                 
-                if os.path.isdir(item_path):
-                    contents.append({
+                if entry.is_dir():
+                    subfolder_contents = []
+                    children.append({
                         "name": item,
                         "type": "folder",
                         "path": rel_path,
-                        "children": self.get_folder_contents(rel_path)
+                        "children": subfolder_contents
                     })
+                    stack.append((entry.path, rel_path, subfolder_contents))
                 else:
-                    contents.append({
+                    children.append({
                         "name": item,
                         "type": "document",
                         "path": rel_path
                     })
             
-            return contents
-            
-        except Exception as e:
-            print(f"Error processing {folder_path}: {str(e)}")
-            return []
+        return contents
 
     def process_document_query(self, doc_path: str, query: str) -> str:
         """Process a query about a specific document."""
         if not self.openai_api_key:
             return "OpenAI API key not configured"
 
+        future, is_leader = _join_inflight(doc_path, query)
+        if not is_leader:
+            return future.result()
         try:
-            # Extract text from PDF
-            full_path = os.path.join(self.base_path, doc_path)
-            pdf = PdfReader(full_path)
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text()
+            answer = self._answer_query(doc_path, query)
+            future.set_result(answer)
+            return answer
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _leave_inflight(doc_path, query)
+
+    async def aprocess_document_query(self, doc_path: str, query: str) -> str:
+        """Process a query about a specific document without blocking a worker."""
+        if not self.openai_api_key:
+            return "OpenAI API key not configured"
+
+        future, is_leader = _join_inflight(doc_path, query)
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+        try:
+            answer = await self._aanswer_query(doc_path, query)
+            future.set_result(answer)
+            return answer
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _leave_inflight(doc_path, query)
+
+    def _answer_query(self, doc_path: str, query: str) -> str:
+        """Answer a document query from the response cache or GPT-4."""
+        try:
+            # Reuse the answer to a near-identical earlier question
+            embedding = self._embed_query(query)
+            version = self._document_version(doc_path)
+            if embedding is not None:
+                cached = _query_cache.lookup(doc_path, version, embedding)
+                if cached is not None:
+                    return cached
+
+            text = self._extract_query_context(doc_path)
 
             # Create OpenAI query with context using new client
             response = self.client.chat.completions.create(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant explaining concepts from documents."},
-                    {"role": "user", "content": f"Based on this document content:\n\n{text[:4000]}...\n\nQuestion: {query}"}
-                ],
+                messages=self._build_query_messages(text, query),
                 temperature=0.7,
                 max_tokens=500
             )
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            if embedding is not None:
+                _query_cache.add(doc_path, version, embedding, answer)
+            return answer
             
         except Exception as e:
-            return f"Error processing query: {str(e)}"
\ No newline at end of file
+            return f"Error processing query: {str(e)}"
+
+    async def _aanswer_query(self, doc_path: str, query: str) -> str:
+        """Async variant of _answer_query."""
+        try:
+            # Flask runs each async view in its own event loop, so the async
+            # client (and its connection pool) can't be shared across requests
+            async with openai.AsyncOpenAI(api_key=self.openai_api_key) as client:
+                # Read the context while the query is embedded. On a response
+                # cache hit it goes unused, and any error reading it is ignored
+                embedding, text = await asyncio.gather(
+                    self._aembed_query(client, query),
+                    asyncio.to_thread(self._extract_query_context, doc_path),
+                    return_exceptions=True
+                )
+                if isinstance(embedding, BaseException):
+                    raise embedding
+                version = self._document_version(doc_path)
+                if embedding is not None:
+                    cached = _query_cache.lookup(doc_path, version, embedding)
+                    if cached is not None:
+                        return cached
+                if isinstance(text, BaseException):
+                    raise text
+
+                response = await client.chat.completions.create(
+                    model="gpt-4",
+                    messages=self._build_query_messages(text, query),
+                    temperature=0.7,
+                    max_tokens=500
+                )
+
+            answer = response.choices[0].message.content
+            if embedding is not None:
+                _query_cache.add(doc_path, version, embedding, answer)
+            return answer
+
+        except Exception as e:
+            return f"Error processing query: {str(e)}"
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Embed a query for the response cache, returning None on failure."""
+        key = embedding_cache.embedding_key(QUERY_EMBEDDING_MODEL, query)
+        embedding = embedding_cache.get(key)
+        if embedding is not None:
+            return embedding
+        try:
+            response = self.client.embeddings.create(model=QUERY_EMBEDDING_MODEL, input=query)
+            embedding = np.array(response.data[0].embedding, dtype=np.float32)
+            embedding_cache.put(key, embedding)
+            return embedding
+        except Exception as e:
+            logger.warning(f"Error embedding query, skipping response cache: {e}")
+            return None
+
+    async def _aembed_query(self, client: openai.AsyncOpenAI, query: str) -> Optional[np.ndarray]:
+        """Async variant of _embed_query using the given client."""
+        key = embedding_cache.embedding_key(QUERY_EMBEDDING_MODEL, query)
+        embedding = embedding_cache.get(key)
+        if embedding is not None:
+            return embedding
+        try:
+            response = await client.embeddings.create(model=QUERY_EMBEDDING_MODEL, input=query)
+            embedding = np.array(response.data[0].embedding, dtype=np.float32)
+            embedding_cache.put(key, embedding)
+            return embedding
+        except Exception as e:
+            logger.warning(f"Error embedding query, skipping response cache: {e}")
+            return None
+
+    def _document_version(self, doc_path: str) -> Optional[Tuple[int, int]]:
+        """Get (mtime_ns, size) of a document, so cached answers follow edits; None if unreadable."""
+        try:
+            st = os.stat(os.path.join(self.base_path, doc_path))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _extract_query_context(self, doc_path: str) -> str:
+        """Extract the leading QUERY_CONTEXT_TOKENS tokens of a document."""
+        full_path = os.path.join(self.base_path, doc_path)
+        # Character-truncated fallbacks are cached apart from token-exact context
+        unit = "tokens" if _get_encoding() is not None else "chars"
+        return _cached_text(
+            full_path,
+            f"context:{QUERY_CONTEXT_TOKENS}:{unit}",
+            lambda path: _truncate_to_tokens(_read_pdf_text(path, QUERY_CONTEXT_MAX_CHARS),
+                                             QUERY_CONTEXT_TOKENS)
+        )
+
+    def _build_query_messages(self, context: str, query: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a document query."""
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT_QUERY},
+            {"role": "user", "content": f"Based on this document content:\n\n{context}...\n\nQuestion: {query}"}
+        ]
+
+
+def _has_utf8_name(entry: os.DirEntry) -> bool:
+    """Check that an entry's name is valid UTF-8, logging entries that will be skipped."""
+    if entry.name.isascii():
+        return True
+    try:
+        entry.name.encode('utf-8')
+    except UnicodeEncodeError:
+        # Undecodable bytes come back as surrogate escapes, which JSON encoders reject
+        logger.warning(f"Skipping {entry.path!r}: name is not valid UTF-8")
+        return False
+    return True
+
+def _has_document_extension(name: str) -> bool:
+    """Check a file name against DOCUMENT_EXTENSIONS, lowercasing only the extension."""
+    # rfind() == -1 leaves just the last character, which never matches
+    return name[name.rfind('.'):].lower() in DOCUMENT_EXTENSIONS
+
+# Seconds before retrying a failed tokenizer load
+ENCODING_RETRY_SECONDS = 60
+
+_encoding: Optional[tiktoken.Encoding] = None
+_encoding_retry_at = 0.0
+_encoding_lock = threading.Lock()
+
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    """Get the GPT-4 tokenizer, or None if it can't be loaded right now."""
+    global _encoding, _encoding_retry_at
+    if _encoding is not None:
+        return _encoding
+    with _encoding_lock:
+        # Only a successful load is kept; failures are retried after a pause
+        # so a network outage doesn't stall every query on a download attempt
+        if _encoding is None and time.monotonic() >= _encoding_retry_at:
+            try:
+                # The first load may download the BPE ranks
+                _encoding = tiktoken.encoding_for_model("gpt-4")
+            except Exception as e:
+                _encoding_retry_at = time.monotonic() + ENCODING_RETRY_SECONDS
+                logger.warning(f"Error loading tokenizer, truncating by characters: {e}")
+        return _encoding
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate text to at most max_tokens GPT-4 tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]  # ~4 characters per token for English text
+    # Every token covers at least one UTF-8 byte, so short texts fit without encoding
+    if len(text.encode('utf-8')) <= max_tokens:
+        return text
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def _read_pdf_text(pdf_path: str, max_chars: int, max_pages: Optional[int] = None) -> str:
+    """Read up to max_chars of a PDF's text, from at most max_pages pages."""
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count if max_pages is None else min(max_pages, doc.page_count)
+        parts = []
+        total = 0
+        # Stop after the page that reaches max_chars; later pages are never loaded
+        for page_num in range(page_count):
+            page_text = doc[page_num].get_text()
+            parts.append(page_text)
+            total += len(page_text)
+            if total >= max_chars:
+                break
+        return "".join(parts)[:max_chars]
+
+def _read_text_preview(pdf_path: str, max_chars: int) -> str:
+    """Read a text preview from a PDF file, returning "" on failure."""
+    try:
+        return _read_pdf_text(pdf_path, max_chars, PREVIEW_MAX_PAGES)
+    except Exception as e:
+        logger.error(f"Error extracting text from {pdf_path}: {e}")
+        return ""
+
+def _extract_text_preview(pdf_path: str, max_chars: int = 1000) -> str:
+    """Extract a text preview from a PDF file (see extract_text_preview)."""
+    try:
+        return _cached_text(pdf_path, f"preview:{max_chars}:{PREVIEW_MAX_PAGES}",
+                            lambda path: _read_text_preview(path, max_chars))
+    except OSError as e:
+        # Missing or renamed since the walk; previews degrade to "" like read errors
+        logger.error(f"Error extracting text from {pdf_path}: {e}")
+        return ""
+
+@lru_cache(maxsize=None)
+def _get_text_cache() -> Cache:
+    """Get the on-disk cache of extracted PDF text, shared across processes."""
+    return Cache(os.path.expanduser("~/.verbum6/cache/pdf_text"))
+
+def _cached_text(pdf_path: str, variant: str, extract: Callable[[str], str]) -> str:
+    """
+    Get extracted text for a PDF from the disk cache, extracting on a miss.
+    
+    Entries are keyed by (path, mtime, size) so edited files are re-read,
+    and stored zstd-compressed.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        variant (str): Kind of extraction, e.g. "full" or "preview:1000:3"
+        extract (Callable[[str], str]): Extracts text from pdf_path
+        
+    Returns:
+        str: Extracted text
+    """
+    st = os.stat(pdf_path)
+    # The trailing tag keeps entries from before compression from matching
+    key = (pdf_path, st.st_mtime_ns, st.st_size, variant, "zstd")
+    cache = _get_text_cache()
+    blob = cache.get(key)
+    if blob is not None:
+        return zstandard.decompress(blob).decode('utf-8', 'surrogatepass')
+    text = extract(pdf_path)
+    cache.set(key, zstandard.compress(text.encode('utf-8', 'surrogatepass')))
+    return text
+
+# Answers to earlier queries, shared by all processors in this process
+_query_cache = SemanticQueryCache()
+
+# Queries currently being answered, so concurrent duplicates share one call
+_inflight: Dict[Tuple[str, bytes], Future] = {}
+_inflight_lock = threading.Lock()
+
+def _inflight_key(doc_path: str, query: str) -> Tuple[str, bytes]:
+    return doc_path, hashlib.blake2b(query.encode()).digest()
+
+def _join_inflight(doc_path: str, query: str) -> Tuple[Future, bool]:
+    """
+    Join the in-flight answer for a query, or register a new one.
+    
+    Returns:
+        Tuple[Future, bool]: The shared future, and whether the caller is
+            the leader that must compute it and then call _leave_inflight()
+    """
+    key = _inflight_key(doc_path, query)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = _inflight[key] = Future()
+        # A running future can't be cancelled, so a cancelled follower (whose
+        # asyncio.wrap_future() propagates cancel()) can't break the leader
+        future.set_running_or_notify_cancel()
+        return future, True
+
+def _leave_inflight(doc_path: str, query: str):
+    """Unregister a finished in-flight query."""
+    with _inflight_lock:
+        _inflight.pop(_inflight_key(doc_path, query), None)
+
+_preview_pool: Optional[ProcessPoolExecutor] = None
+_preview_pool_lock = threading.Lock()
+
+def _get_preview_pool() -> ProcessPoolExecutor:
+    """Get the shared preview worker pool, starting it on first use."""
+    global _preview_pool
+    with _preview_pool_lock:
+        if _preview_pool is None:
+            # PDF parsing also contends for disk, so returns flatten past ~6 workers
+            _preview_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, MAX_PREVIEW_WORKERS)
+            )
+        return _preview_pool
+
+@lru_cache(maxsize=256)
+def _cached_preview(pdf_path: str, mtime_ns: int) -> str:
+    return _extract_text_preview(pdf_path)
+
+@lru_cache(maxsize=8)
+def get_processor(root_path: str) -> DocumentProcessor:
+    """Get a shared DocumentProcessor for a root path."""
+    return DocumentProcessor(root_path)
+
+# Hierarchy caches are keyed by (root path, root mtime, age bucket). Only the
+# root directory is stat'ed, so edits deeper in the tree show up when the
+# bucket rolls over, or right away after invalidate().
+@lru_cache(maxsize=32)
+def _cached_hierarchy(root_path: str, mtime_ns: int, age_bucket: int) -> bytes:
+    return get_processor(root_path)._build_folder_hierarchy()
+
+@lru_cache(maxsize=32)
+def _cached_relationships(root_path: str, mtime_ns: int, age_bucket: int,
+                          include_previews: bool = False) -> bytes:
+    hierarchy = get_processor(root_path).build_hierarchy(include_previews)
+    return msgspec.json.encode({
+        'status': 'success',
+        'hierarchy': hierarchy
+    }, enc_hook=_encode_array)
+
+def _encode_array(obj: Any) -> Any:
+    """msgspec hook encoding float32 node vectors as JSON number arrays."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
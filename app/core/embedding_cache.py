@@ -0,0 +1,69 @@
+"""
+app/core/embedding_cache.py
+Persistent cache of embedding vectors.
+
+Vectors are stored on disk as raw float32 bytes, keyed by a SHA-256 of the
+model name and input text, so embeddings survive restarts and are shared
+between worker processes instead of being re-requested from OpenAI.
+
+Setting EMBEDDING_CACHE_DTYPE=int8 stores vectors quantized to int8 with a
+per-vector float32 scale instead, a quarter of the bytes at a cosine error
+far below anything the distance or query-cache thresholds can notice.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+from diskcache import Cache
+
+def embedding_key(model: str, text: str) -> bytes:
+    """Build the cache key for embedding text with a model."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+# On-disk format: "float32" (raw) or "int8" (float32 scale + int8 values)
+STORAGE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+@lru_cache(maxsize=None)
+def _get_cache() -> Cache:
+    """Get the on-disk embedding store (sqlite in WAL mode, via diskcache)."""
+    # Each format has its own directory, so switching never misreads entries
+    name = "embeddings" if STORAGE_DTYPE == "float32" else f"embeddings-{STORAGE_DTYPE}"
+    return Cache(os.path.expanduser(f"~/.verbum6/cache/{name}"))
+
+def get(key: bytes) -> Optional[np.ndarray]:
+    """
+    Look up a cached embedding.
+    
+    Args:
+        key (bytes): Key from embedding_key()
+        
+    Returns:
+        Optional[np.ndarray]: float32 vector (read-only unless int8-stored),
+            or None on a miss
+    """
+    blob = _get_cache().get(key)
+    if blob is None:
+        return None
+    if STORAGE_DTYPE == "int8":
+        scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+        return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+    return np.frombuffer(blob, dtype=np.float32)
+
+def put(key: bytes, vector: np.ndarray):
+    """
+    Store an embedding.
+    
+    Args:
+        key (bytes): Key from embedding_key()
+        vector (np.ndarray): Embedding vector, stored as STORAGE_DTYPE
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    if STORAGE_DTYPE == "int8":
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = np.float32(peak / 127 if peak else 1.0)
+        quantized = np.clip(np.round(vector / scale), -127, 127).astype(np.int8)
+        _get_cache().set(key, scale.tobytes() + quantized.tobytes())
+        return
+    _get_cache().set(key, vector.tobytes())
@@ -0,0 +1,110 @@
+"""
+app/core/query_cache.py
+Semantic response cache for document queries.
+
+Each answered query is stored with its embedding, one matrix per document.
+A new query whose embedding is close enough (cosine similarity at or above
+the threshold) to a stored one reuses that answer instead of calling the
+chat model again. Entries are tied to a version of the document, so
+answers about a file's old contents are dropped once it changes.
+"""
+
+import threading
+from typing import Dict, Hashable, List, Optional
+import numpy as np
+
+class _DocumentAnswers:
+    """Embeddings and answers for one version of a document, oldest overwritten first."""
+    __slots__ = ('version', 'matrix', 'responses', 'next')
+
+    def __init__(self, version: Hashable, dim: int):
+        self.version = version
+        # Normalized embeddings, one row per answer. Stored as float16 to
+        # halve memory; cosine scores barely move. Rows past len(responses)
+        # are unused capacity.
+        self.matrix = np.empty((8, dim), dtype=np.float16)
+        self.responses: List[str] = []
+        # Row the next answer goes to once the cap is reached
+        self.next = 0
+
+class SemanticQueryCache:
+    """Caches query responses per document, matched by embedding similarity."""
+
+    def __init__(self, dim: int = 1536, threshold: float = 0.9, max_entries: int = 256):
+        """
+        Initialize the cache.
+
+        Args:
+            dim (int): Dimension of the query embeddings
+            threshold (float): Minimum cosine similarity for a cache hit
+            max_entries (int): Answers kept per document; the oldest is replaced
+        """
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._documents: Dict[str, _DocumentAnswers] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, doc_path: str, version: Optional[Hashable],
+               embedding: np.ndarray) -> Optional[str]:
+        """
+        Find a cached response for a query about a document.
+
+        Args:
+            doc_path (str): Document the query is about
+            version (Optional[Hashable]): Current version of the document, e.g.
+                (mtime_ns, size); None if unknown, which matches any version
+            embedding (np.ndarray): Embedding of the query
+
+        Returns:
+            Optional[str]: Cached response, or None on a miss
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry = self._documents.get(doc_path)
+            if entry is None or (version is not None and entry.version != version):
+                return None
+            # Upcast for the BLAS float32 matmul; numpy has no float16 GEMV
+            scores = entry.matrix[:len(entry.responses)].astype(np.float32) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return entry.responses[best]
+        return None
+
+    def add(self, doc_path: str, version: Optional[Hashable],
+            embedding: np.ndarray, response: str):
+        """
+        Store the response to a query about a document.
+
+        Args:
+            doc_path (str): Document the query is about
+            version (Optional[Hashable]): Version of the document the response is about
+            embedding (np.ndarray): Embedding of the query
+            response (str): Response to cache
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry = self._documents.get(doc_path)
+            if entry is None or entry.version != version:
+                # A new document version starts empty, dropping stale answers
+                entry = self._documents[doc_path] = _DocumentAnswers(version, self.dim)
+            count = len(entry.responses)
+            if count < self.max_entries:
+                if count == len(entry.matrix):
+                    # Grow geometrically so adds copy the matrix O(log n) times
+                    grown = np.empty((min(2 * count, self.max_entries), self.dim),
+                                     dtype=np.float16)
+                    grown[:count] = entry.matrix
+                    entry.matrix = grown
+                entry.matrix[count] = vector
+                entry.responses.append(response)
+            else:
+                entry.matrix[entry.next] = vector
+                entry.responses[entry.next] = response
+                entry.next = (entry.next + 1) % self.max_entries
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        """L2-normalize an embedding so inner product equals cosine similarity."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
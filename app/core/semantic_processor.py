@@ -1,16 +1,48 @@
 import os
 import numpy as np
 import logging
+from itertools import islice
 from openai import OpenAI
-from PyPDF2 import PdfReader
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from collections import defaultdict
+from app.core import embedding_cache
 from app.core.user_context import UserContext
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Maximum number of inputs per embeddings request
+EMBEDDING_BATCH_SIZE = 2048
+
+# Maps word separators in document file names to spaces in a single pass
+_NAME_SEPARATORS = str.maketrans('_-', '  ')
+
+def _iter_pdf_names(root: str) -> Iterator[str]:
+    """Yield PDF file names under root in os.walk order, scanning directories lazily."""
+    stack = [root]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith('.pdf'):
+                        yield entry.name
+        except OSError:
+            continue
+        # Reversed so subdirectories are visited in listing order
+        stack.extend(reversed(subdirs))
+
+def _unit_vector(vector: np.ndarray) -> np.ndarray:
+    """Scale a vector to unit length (zero vectors are returned unchanged)."""
+    norm = np.linalg.norm(vector)
+    # Division returns a new array, so read-only cache buffers are never written
+    return vector / norm if norm else vector
+
 class SemanticProcessor:
     def __init__(self, base_path: str):
         self.base_path = base_path
@@ -29,29 +61,41 @@ class SemanticProcessor:
             logger.info(f"Processing {len(top_folders)} top-level folders")
             
             # Add "Me" node at the center
-            folder_embeddings = {"Me": self._get_user_embedding()}
+            names = ["Me"]
+            vectors = [self._get_user_embedding()]
+            weights = [1.0]
             
             # Get embeddings for folders
+            embeddings = self._get_folder_embeddings(top_folders)
             for folder in top_folders:
-                embedding = self._get_folder_embedding(folder)
+                embedding = embeddings.get(folder)
                 if embedding is not None:
+                    names.append(folder)
+                    vectors.append(embedding)
                     # Apply user preference weighting
-                    user_weight = self.user_context.preferences["domains"].get(folder, 0.5)
-                    weighted_embedding = embedding * user_weight
-                    folder_embeddings[folder] = weighted_embedding
+                    weights.append(self.user_context.preferences["domains"].get(folder, 0.5))
                 else:
                     logger.warning(f"Could not generate embedding for folder: {folder}")
             
-            # Compute distances including "Me" node
-            all_nodes = ["Me"] + top_folders
-            for i, node1 in enumerate(all_nodes):
-                for node2 in all_nodes[i+1:]:
-                    if node1 in folder_embeddings and node2 in folder_embeddings:
-                        distance = self._compute_distance(
-                            folder_embeddings[node1],
-                            folder_embeddings[node2]
-                        )
-                        distances[(node1, node2)] = distance
+            if vectors[0] is None:
+                del names[0], vectors[0], weights[0]
+            if len(names) < 2:
+                return distances
+            
+            # Parallel arrays: names[i] labels row i of one contiguous float32
+            # matrix, filled in place rather than stacked from weighted copies
+            matrix = np.empty((len(names), len(vectors[0])), dtype=np.float32)
+            for row, (vector, weight) in enumerate(zip(vectors, weights)):
+                np.multiply(vector, weight, out=matrix[row], casting='same_kind')
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+            # Compute distances including "Me" node with a single matrix product
+            distance_matrix = 1.0 - matrix @ matrix.T
+            
+            rows, cols = np.triu_indices(len(names), k=1)
+            for i, j in zip(rows.tolist(), cols.tolist()):
+                distances[(names[i], names[j])] = float(distance_matrix[i, j])
             
             return distances
             
@@ -90,30 +134,33 @@ class SemanticProcessor:
     def _get_top_level_folders(self) -> List[str]:
         """Get all top-level folders in the base path."""
         try:
-            return [d for d in os.listdir(self.base_path) 
-                    if os.path.isdir(os.path.join(self.base_path, d))
-                    and not d.startswith('.')]
+            with os.scandir(self.base_path) as it:
+                return [entry.name for entry in it
+                        if entry.is_dir() and not entry.name.startswith('.')]
         except Exception as e:
             logger.error(f"Error getting top-level folders: {str(e)}")
             return []
     
-    def _get_folder_embedding(self, folder_path: str) -> Optional[np.ndarray]:
-        """Compute aggregate embedding for a folder based on its contents."""
-        try:
+    def _get_folder_embeddings(self, folder_paths: List[str]) -> Dict[str, np.ndarray]:
+        """Compute aggregate embeddings for folders, batching uncached ones into one request."""
+        embeddings = {}
+        pending = []
+        for folder_path in folder_paths:
             if folder_path in self.embeddings_cache:
-                return self.embeddings_cache[folder_path]
-                
+                embeddings[folder_path] = self.embeddings_cache[folder_path]
+                continue
             folder_summary = self._generate_folder_summary(folder_path)
-            if not folder_summary:
-                return None
-                
-            embedding = self._get_text_embedding(folder_summary)
-            self.embeddings_cache[folder_path] = embedding
-            return embedding
-            
-        except Exception as e:
-            logger.error(f"Error generating embedding for {folder_path}: {str(e)}")
-            return None
+            if folder_summary:
+                pending.append((folder_path, folder_summary))
+        
+        if pending:
+            vectors = self._get_text_embeddings_batch([summary for _, summary in pending])
+            for (folder_path, _), embedding in zip(pending, vectors):
+                if embedding is not None:
+                    self.embeddings_cache[folder_path] = embedding
+                    embeddings[folder_path] = embedding
+        
+        return embeddings
     
     def _generate_folder_summary(self, folder_path: str) -> str:
         """Generate a summary of folder contents for embedding."""
@@ -125,25 +172,21 @@ class SemanticProcessor:
             content_summary.append(f"Knowledge domain: {folder_path}")
             
             # Add subfolder names as subdomains
-            subfolders = [
-                d for d in os.listdir(full_path)
-                if os.path.isdir(os.path.join(full_path, d))
-                and not d.startswith('.')
-            ]
+            with os.scandir(full_path) as it:
+                subfolders = [
+                    entry.name for entry in it
+                    if entry.is_dir() and not entry.name.startswith('.')
+                ]
             if subfolders:
                 content_summary.append(f"Subdomains: {', '.join(subfolders)}")
             
-            # Sample document titles for topic inference
-            docs = []
-            for root, _, files in os.walk(full_path):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        # Clean and format document names
-                        doc_name = os.path.splitext(file)[0]
-                        doc_name = doc_name.replace('_', ' ').replace('-', ' ')
-                        docs.append(doc_name)
-                    if len(docs) >= 5:  # Limit to 5 representative documents
-                        break
+            # Sample document titles for topic inference, limited to 5
+            # representative documents; scanning stops once they are found
+            docs = [
+                # Clean and format document names
+                os.path.splitext(file)[0].translate(_NAME_SEPARATORS)
+                for file in islice(_iter_pdf_names(full_path), 5)
+            ]
             if docs:
                 content_summary.append(f"Representative topics: {', '.join(docs)}")
             
@@ -154,23 +197,60 @@ class SemanticProcessor:
             return ""
     
     def _get_text_embedding(self, text: str) -> Optional[np.ndarray]:
-        """Get embedding vector for text using OpenAI's API."""
+        """Get the unit-length embedding of text from the disk cache or OpenAI's API."""
+        text = text[:8191]  # API token limit
+        key = embedding_cache.embedding_key(EMBEDDING_MODEL, text)
+        cached = embedding_cache.get(key)
+        if cached is not None:
+            # Normalized again in case the cache holds int8-quantized vectors
+            return _unit_vector(cached)
+        
         try:
             response = self.client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text[:8191]  # API token limit
+                model=EMBEDDING_MODEL,
+                input=text
             )
-            return np.array(response.data[0].embedding)
+            embedding = _unit_vector(np.asarray(response.data[0].embedding, dtype=np.float32))
+            embedding_cache.put(key, embedding)
+            return embedding
             
         except Exception as e:
             logger.error(f"Error getting embedding from OpenAI: {str(e)}")
             return None
     
+    def _get_text_embeddings_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Get unit-length embeddings for several texts, requesting only cache misses."""
+        texts = [text[:8191] for text in texts]  # API token limit
+        keys = [embedding_cache.embedding_key(EMBEDDING_MODEL, text) for text in texts]
+        embeddings = [embedding_cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        try:
+            for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+                batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+                response = self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=[texts[i] for i in batch]
+                )
+                # Each result carries the index of its input within the batch
+                for item in response.data:
+                    i = batch[item.index]
+                    embeddings[i] = np.asarray(item.embedding, dtype=np.float32)
+                    embedding_cache.put(keys[i], embeddings[i])
+            
+        except Exception as e:
+            logger.error(f"Error getting embeddings from OpenAI: {str(e)}")
+        
+        return [
+            _unit_vector(embedding) if embedding is not None else None
+            for embedding in embeddings
+        ]
+    
     def _compute_distance(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
-        """Compute semantic distance between two embeddings."""
+        """Compute semantic distance between two unit-length embeddings."""
         try:
-            similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-            return 1 - similarity
+            # Embeddings are normalized when fetched, so the dot product is the cosine
+            return float(1.0 - np.dot(emb1, emb2))
             
         except Exception as e:
             logger.error(f"Error computing distance: {str(e)}")
@@ -1,14 +1,32 @@
 # app core user_context.py
 
 from typing import Dict, List, Optional
-import json
+import logging
 import os
+import tempfile
+import threading
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Updates within this many seconds of the first unsaved one are written together
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+# Bounds on the click transition table: paths with recorded successors (least
+# recently clicked dropped first) and successors kept per path (rarest dropped)
+MAX_TRANSITION_PATHS = 500
+MAX_NEXT_STEPS = 10
+
+def _context_path() -> str:
+    """Get the path of the user context file."""
+    return os.path.expanduser("~/.verbum6/user_context.json")
 
 class UserContext:
     def __init__(self):
         self.preferences = {
             "domains": {},        # Domain weights based on user interaction
             "recent_clicks": [],  # Track recent navigation paths
+            "transitions": {},    # Click counts: previous path -> {next path: count}
             "expertise_levels": {
                 "math": 0.0,
                 "physics": 0.0,
@@ -17,6 +35,8 @@ class UserContext:
                 "medicine": 0.0
             }
         }
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
         self.load_context()
     
     def update_domain_interest(self, domain: str, weight: float = 0.1):
@@ -27,33 +47,38 @@ class UserContext:
     
     def add_click(self, path: str):
         """Record user navigation."""
+        if self.preferences["recent_clicks"]:
+            self._record_transition(self.preferences["recent_clicks"][-1], path)
         self.preferences["recent_clicks"].append(path)
         self.preferences["recent_clicks"] = self.preferences["recent_clicks"][-5:]  # Keep last 5
         self.save_context()
     
+    def _record_transition(self, previous: str, path: str):
+        """Count a click on path right after previous, keeping the table bounded."""
+        transitions = self.preferences["transitions"]
+        # Re-inserting moves previous to the end, so dict order tracks recency
+        next_steps = transitions.pop(previous, {})
+        transitions[previous] = next_steps
+        if len(transitions) > MAX_TRANSITION_PATHS:
+            del transitions[next(iter(transitions))]
+        if path not in next_steps and len(next_steps) >= MAX_NEXT_STEPS:
+            del next_steps[min(next_steps, key=next_steps.get)]
+        next_steps[path] = next_steps.get(path, 0) + 1
+    
     def predict_next_click(self, current_path: str) -> Optional[str]:
         """Predict user's next likely destination based on history and interests."""
         try:
             # Get current domain from path
             current_domain = current_path.split('/')[0] if '/' in current_path else current_path
             
-            # Get recent paths in same domain
-            domain_clicks = [
-                click for click in self.preferences["recent_clicks"]
-                if click.startswith(current_domain)
-            ]
-            
-            if domain_clicks:
-                # Find common next steps from this path
-                next_steps = []
-                for i, click in enumerate(domain_clicks[:-1]):
-                    if click == current_path:
-                        next_steps.append(domain_clicks[i + 1])
-                
-                if next_steps:
-                    # Return most common next step
-                    from collections import Counter
-                    return Counter(next_steps).most_common(1)[0][0]
+            # Return the most common next step from this path in the same domain
+            next_steps = {
+                step: count
+                for step, count in self.preferences["transitions"].get(current_path, {}).items()
+                if step.startswith(current_domain)
+            }
+            if next_steps:
+                return max(next_steps, key=next_steps.get)
             
             # If no history, suggest based on domain interests
             domain_interests = sorted(
@@ -73,17 +98,40 @@ class UserContext:
     
     def load_context(self):
         """Load user context from file."""
-        context_path = os.path.expanduser("~/.verbum6/user_context.json")
+        context_path = _context_path()
         try:
             if os.path.exists(context_path):
-                with open(context_path, 'r') as f:
-                    self.preferences = json.load(f)
+                with open(context_path, 'rb') as f:
+                    self.preferences = orjson.loads(f.read())
         except Exception as e:
-            print(f"Error loading user context: {e}")
+            logger.error(f"Error loading user context: {e}")
+        # Context files saved before transitions were tracked lack the key
+        self.preferences.setdefault("transitions", {})
     
     def save_context(self):
-        """Save user context to file."""
-        context_path = os.path.expanduser("~/.verbum6/user_context.json")
-        os.makedirs(os.path.dirname(context_path), exist_ok=True)
-        with open(context_path, 'w') as f:
-            json.dump(self.preferences, f)
\ No newline at end of file
+        """Schedule a save of the user context, coalescing bursts of updates."""
+        with self._save_lock:
+            if self._save_timer is None:
+                # Not a daemon thread, so a pending save still runs at exit
+                self._save_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.flush_context)
+                self._save_timer.start()
+    
+    def flush_context(self):
+        """Write the user context to file now, replacing it atomically."""
+        context_path = _context_path()
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            data = orjson.dumps(self.preferences)
+            os.makedirs(os.path.dirname(context_path), exist_ok=True)
+            # A unique temp file in the same directory, so concurrent writers
+            # never share it and os.replace() stays a same-filesystem rename
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(context_path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, context_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
\ No newline at end of file
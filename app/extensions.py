@@ -0,0 +1,10 @@
+"""
+app/extensions.py
+Flask extension instances, initialized by the application factory.
+"""
+
+from flask_caching import Cache
+from flask_compress import Compress
+
+cache = Cache()
+compress = Compress()
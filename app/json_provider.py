@@ -0,0 +1,28 @@
+"""
+app/json_provider.py
+orjson-backed JSON handling for Flask's jsonify() and request.get_json().
+"""
+
+from typing import Any, Union
+import orjson
+from flask.json.provider import JSONProvider
+
+# Non-string dict keys and numpy arrays/scalars serialize without conversion
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider using orjson. Keys keep insertion order and output is compact."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize obj to a JSON string."""
+        return orjson.dumps(obj, option=_DUMPS_OPTIONS).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response, passing orjson's bytes through without decoding."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=_DUMPS_OPTIONS),
+                                        mimetype="application/json")
@@ -22,8 +22,9 @@ class VoronoiMap {
     async initialize() {
         try {
             // Fetch both hierarchy and semantic distances
+            const hierarchyUrl = this.container.attr('data-hierarchy-url') || '/api/hierarchy';
             const [hierarchyResponse, distancesResponse] = await Promise.all([
-                fetch('/api/hierarchy'),
+                fetch(hierarchyUrl),
                 fetch('/api/semantic-distances/level-0')
             ]);
             
@@ -11,9 +11,12 @@ Usage:
 Environment Variables:
     FLASK_ENV: The environment to run in (development, testing, production)
     OPENAI_API_KEY: API key for OpenAI integration (optional for basic functionality)
+    PORT: Port to serve on outside development (default: 8000)
+    WEB_THREADS: Worker threads serving requests outside development (default: 8)
 """
 
 import os
+from waitress import serve
 from app import create_app
 
 # Get environment configuration
@@ -22,7 +25,10 @@ app = create_app(env)
 
 if __name__ == '__main__':
     # Development server configuration
+    # Serve requests on separate threads so slow PDF/OpenAI calls don't block others
     if env == 'development':
-        app.run(debug=True, port=5001)
+        app.run(debug=True, port=5001, threaded=True)
     else:
-        app.run()
\ No newline at end of file
+        # Flask's built-in server isn't meant for production; use waitress
+        serve(app, host='0.0.0.0', port=int(os.getenv('PORT', 8000)),
+              threads=int(os.getenv('WEB_THREADS', 8)))
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+scripts/build_hierarchy.py
+Pre-build the document hierarchy as a static JSON file.
+
+Writes the /api/hierarchy payload to app/static/hierarchy.json so it can be
+served as a plain static file (for example straight from nginx) instead of
+walking the document folder per request. Set STATIC_HIERARCHY=1 to make the
+frontend load it.
+
+Usage:
+    python scripts/build_hierarchy.py           # build once
+    python scripts/build_hierarchy.py --watch   # rebuild on file changes
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.core.document_processor import DocumentProcessor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def build(upload_folder, output_path):
+    """Write the hierarchy JSON atomically so readers never see a partial file."""
+    processor = DocumentProcessor(upload_folder)
+    processor.invalidate()
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(processor.get_hierarchy())
+    os.replace(tmp_path, output_path)
+    logger.info(f"Wrote {output_path}")
+
+def watch(upload_folder, output_path, delay=1.0):
+    """Rebuild whenever files under the upload folder change."""
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    changed = threading.Event()
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.event_type in ('created', 'deleted', 'modified', 'moved'):
+                changed.set()
+
+    observer = Observer()
+    observer.schedule(Handler(), upload_folder, recursive=True)
+    observer.start()
+    logger.info(f"Watching {upload_folder}")
+    try:
+        while True:
+            changed.wait()
+            # Let bursts of events (e.g. a folder copy) settle into one rebuild
+            while changed.wait(delay):
+                changed.clear()
+            build(upload_folder, output_path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and rebuild when documents change')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+    upload_folder = app.config['UPLOAD_FOLDER']
+    output_path = os.path.join(app.static_folder, 'hierarchy.json')
+
+    build(upload_folder, output_path)
+    if args.watch:
+        watch(upload_folder, output_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+wsgi.py
+WSGI entry point for running Verbum6 under a production server.
+
+Usage:
+    gunicorn -w $(nproc) -k gthread --threads 8 wsgi:application
+
+Environment Variables:
+    FLASK_ENV: The environment to run in (default: production)
+"""
+
+import os
+from app import create_app
+
+application = create_app(os.getenv('FLASK_ENV', 'production'))